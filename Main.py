@@ -3,6 +3,7 @@ import time
 import random
 import math
 import json
+import TrafficStats
 #I LOVE MY UFAR
 # ---------------------------
 # Configuration
@@ -13,6 +14,7 @@ STAGE_DURATION = 30             # seconds per stage
 SIMULATION_FPS = 60
 CAR_SIZE = 40
 SAFE_DISTANCE = 30
+STOP_MIN_FRAMES = 15           # frames a car must be held before it counts as a stop
 WIDTH, HEIGHT = 800, 800
 
 # limits for green durations (in seconds)
@@ -22,6 +24,9 @@ MAX_GREEN = 12
 # score weights
 COLLISION_PENALTY = 10
 AVG_QUEUE_WEIGHT = 0.2
+P95_TRAVEL_WEIGHT = 0.0     # set > 0 to penalise the slow tail of travel times
+MEAN_DELAY_WEIGHT = 0.0     # set > 0 to penalise average per-car delay (seconds)
+MEAN_STOPS_WEIGHT = 0.0     # set > 0 to penalise average stops per car
 
 # schedule generation
 SCHEDULE_DURATION = 120  # seconds for schedule
@@ -96,14 +101,44 @@ stage_number = int(learned_state.get("stage", 1))
 
 print(f"Loaded learning: stage={stage_number}, best={best_candidate}, best_score={best_score}")
 
+# run-level traffic stats, never reset (per-stage stats live in env)
+run_traffic_stats = TrafficStats.new_traffic_stats()
+
 # ---------------------------
 # Utility / spawn functions
 # ---------------------------
-def spawn_car_ns(speed, color):
-    return {"x": WIDTH//2 - CAR_SIZE//2, "y": -CAR_SIZE, "speed": speed, "color": color}
-
-def spawn_car_ew(speed, color):
-    return {"x": -CAR_SIZE, "y": HEIGHT//2 - CAR_SIZE//2, "speed": speed, "color": color}
+def spawn_car_ns(speed, color, spawn_frame=0):
+    return {"x": WIDTH//2 - CAR_SIZE//2, "y": -CAR_SIZE, "speed": speed, "color": color,
+            "spawn_frame": spawn_frame, "held_frames": 0, "held_total": 0, "stops": 0}
+
+def spawn_car_ew(speed, color, spawn_frame=0):
+    return {"x": -CAR_SIZE, "y": HEIGHT//2 - CAR_SIZE//2, "speed": speed, "color": color,
+            "spawn_frame": spawn_frame, "held_frames": 0, "held_total": 0, "stops": 0}
+
+def update_stop_state(car, can_move):
+    # only count a stop once the car has been held for STOP_MIN_FRAMES in a row,
+    # so the one-frame stutter of car-following / conflict checks is ignored
+    if can_move:
+        car["held_frames"] = 0
+        return
+    car["held_frames"] += 1
+    car["held_total"] += 1
+    if car["held_frames"] == STOP_MIN_FRAMES:
+        car["stops"] += 1
+
+def record_car_departure(env, approach, car, finished=True):
+    # both times in simulation frames, so slow rendering frames don't show up as delay
+    travel_time = (env["frame"] - car["spawn_frame"] + 1) / SIMULATION_FPS
+    delay = car["held_total"] / SIMULATION_FPS
+    for stats in (env["traffic_stats"], run_traffic_stats):
+        TrafficStats.record_departure(stats, approach, travel_time, delay, car["stops"], finished)
+
+def record_unfinished_cars(env):
+    # cars still on the road would otherwise be dropped, hiding the slow tail
+    for c in env["cars_ns"]:
+        record_car_departure(env, "NS", c, finished=False)
+    for c in env["cars_ew"]:
+        record_car_departure(env, "EW", c, finished=False)
 
 # ---------------------------
 # Reset simulation environment (for starting a stage or after collision)
@@ -119,6 +154,8 @@ def reset_environment():
     env["collision_count"] = 0
     env["queue_sum"] = 0.0
     env["queue_samples"] = 0
+    env["frame"] = 0
+    env["traffic_stats"] = TrafficStats.new_traffic_stats()
     return env
 
 # ---------------------------
@@ -152,7 +189,12 @@ def compute_score(env):
     passed = env["cars_passed_ns"] + env["cars_passed_ew"]
     collisions = env["collision_count"]
     avg_queue = (env["queue_sum"] / env["queue_samples"]) if env["queue_samples"] > 0 else 0.0
-    score = passed - COLLISION_PENALTY * collisions - AVG_QUEUE_WEIGHT * avg_queue
+    traffic = env["traffic_stats"]
+    p95_travel = TrafficStats.traffic_percentile(traffic, 95) if P95_TRAVEL_WEIGHT else 0.0
+    mean_delay = TrafficStats.traffic_mean(traffic, "delay")
+    mean_stops = TrafficStats.traffic_mean(traffic, "stops")
+    score = passed - COLLISION_PENALTY * collisions - AVG_QUEUE_WEIGHT * avg_queue - P95_TRAVEL_WEIGHT * p95_travel \
+        - MEAN_DELAY_WEIGHT * mean_delay - MEAN_STOPS_WEIGHT * mean_stops
     return score, passed, collisions, avg_queue
 
 # init environment & stage trackers
@@ -180,14 +222,16 @@ while running:
     light_ns_color = GREEN if current_green == "NS" else RED
     light_ew_color = GREEN if current_green == "EW" else RED
 
+    env["frame"] += 1
+
     # spawn cars from deterministic schedule
     sim_time = now - env["start_time"]
     while env["schedule_index"] < len(base_schedule) and sim_time >= base_schedule[env["schedule_index"]]["time"]:
         item = base_schedule[env["schedule_index"]]
         if item["dir"] == "NS":
-            env["cars_ns"].append(spawn_car_ns(item["speed"], item["color"]))
+            env["cars_ns"].append(spawn_car_ns(item["speed"], item["color"], env["frame"]))
         else:
-            env["cars_ew"].append(spawn_car_ew(item["speed"], item["color"]))
+            env["cars_ew"].append(spawn_car_ew(item["speed"], item["color"], env["frame"]))
         env["schedule_index"] += 1
 
     # compute instantaneous queues
@@ -217,6 +261,7 @@ while running:
             if random.random() < 0.5:
                 can_move = False
 
+        update_stop_state(car, can_move)
         if can_move:
             car["y"] += car["speed"]
 
@@ -240,6 +285,7 @@ while running:
             if random.random() < 0.5:
                 can_move = False
 
+        update_stop_state(car, can_move)
         if can_move:
             car["x"] += car["speed"]
 
@@ -258,9 +304,15 @@ while running:
         if collision_happened:
             break
 
-    # Count passed cars
+    # Count passed cars (and feed travel stats as they leave)
     before_ns = len(env["cars_ns"])
     before_ew = len(env["cars_ew"])
+    for c in env["cars_ns"]:
+        if c["y"] > HEIGHT:
+            record_car_departure(env, "NS", c)
+    for c in env["cars_ew"]:
+        if c["x"] > WIDTH:
+            record_car_departure(env, "EW", c)
     env["cars_ns"] = [c for c in env["cars_ns"] if c["y"] <= HEIGHT]
     env["cars_ew"] = [c for c in env["cars_ew"] if c["x"] <= WIDTH]
     env["cars_passed_ns"] += before_ns - len(env["cars_ns"])
@@ -270,8 +322,12 @@ while running:
 
     # If stage ends (time or collision), evaluate and save
     if stage_elapsed >= STAGE_DURATION or stage_ended_early:
+        record_unfinished_cars(env)
         score, passed, collisions, avg_queue = compute_score(env)
         print(f"Stage {stage_number} candidate {stage_candidate} => score={score:.2f}, passed={passed}, collisions={collisions}, avg_queue={avg_queue:.2f}")
+        print(TrafficStats.format_traffic_summary(TrafficStats.summarize_traffic_stats(env["traffic_stats"])))
+        print("Run so far:")
+        print(TrafficStats.format_traffic_summary(TrafficStats.summarize_traffic_stats(run_traffic_stats)))
 
         improved = False
         if score > best_score:
@@ -318,6 +374,8 @@ while running:
     elapsed_stage = time.time() - stage_start_time
     time_left = max(0.0, STAGE_DURATION - elapsed_stage)
     score_preview, passed_preview, coll_preview, avgq_preview = compute_score(env)
+    p95_ns_preview = TrafficStats.traffic_percentile(env["traffic_stats"], 95, ("NS",))
+    p95_ew_preview = TrafficStats.traffic_percentile(env["traffic_stats"], 95, ("EW",))
 
     ui_lines = [
         f"Stage: {stage_number}",
@@ -326,6 +384,7 @@ while running:
         f"Stage time left: {time_left:.1f}s",
         f"Stage score so far: {score_preview:.2f}  passed:{env['cars_passed_ns']+env['cars_passed_ew']} coll:{env['collision_count']}",
         f"Avg queue (so far): {((env['queue_sum']/env['queue_samples']) if env['queue_samples'] else 0.0):.2f}",
+        f"p95 travel NS/EW: {p95_ns_preview:.1f}s / {p95_ew_preview:.1f}s",
         f"Schedule index: {env['schedule_index']}/{len(base_schedule)}",
         f"Loaded best score: {best_score:.2f}"
     ]
@@ -338,4 +397,8 @@ while running:
     pygame.display.update()
     clock.tick(SIMULATION_FPS)
 
+record_unfinished_cars(env)
+print("Run totals:")
+print(TrafficStats.format_traffic_summary(TrafficStats.summarize_traffic_stats(run_traffic_stats)))
+
 pygame.quit()
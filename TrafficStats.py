@@ -0,0 +1,160 @@
+import math
+
+# ---------------------------
+# Streaming traffic statistics
+# ---------------------------
+# Everything here is updated one car at a time as it leaves the intersection
+# and keeps a fixed amount of state, so memory does not grow with run length.
+# Cars still on the road when a stage ends are recorded with their travel
+# time so far (a lower bound) and counted as "unfinished".
+
+APPROACHES = ("NS", "EW")
+
+# travel-time histogram: fixed-width bins from 0 up to HIST_MAX_SECONDS,
+# anything slower lands in a single overflow bin
+HIST_BIN_SECONDS = 0.25
+HIST_MAX_SECONDS = 120.0
+
+PERCENTILES = (50, 95, 99)
+
+
+# ---------------------------
+# Running moments (Welford)
+# ---------------------------
+def new_running_stats():
+    return {"count": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+
+def update_running_stats(rs, value):
+    rs["count"] += 1
+    delta = value - rs["mean"]
+    rs["mean"] += delta / rs["count"]
+    rs["m2"] += delta * (value - rs["mean"])
+    rs["min"] = value if rs["min"] is None else min(rs["min"], value)
+    rs["max"] = value if rs["max"] is None else max(rs["max"], value)
+
+def running_std(rs):
+    if rs["count"] < 2:
+        return 0.0
+    return math.sqrt(rs["m2"] / (rs["count"] - 1))
+
+
+# ---------------------------
+# Fixed-bin histogram
+# ---------------------------
+def new_histogram(bin_width=HIST_BIN_SECONDS, max_value=HIST_MAX_SECONDS):
+    n_bins = int(math.ceil(max_value / bin_width))
+    return {"bin_width": bin_width, "counts": [0] * n_bins, "overflow": 0, "total": 0}
+
+def update_histogram(hist, value):
+    index = int(max(0.0, value) // hist["bin_width"])
+    if index < len(hist["counts"]):
+        hist["counts"][index] += 1
+    else:
+        hist["overflow"] += 1
+    hist["total"] += 1
+
+def histogram_percentile(hist, p, overflow_value=None):
+    """Approximate p-th percentile (0..100), interpolating inside the bin.
+
+    Values in the overflow bin are reported as overflow_value (e.g. the
+    observed max) or, if not given, as the histogram's upper edge.
+    """
+    if hist["total"] == 0:
+        return 0.0
+    target = p / 100.0 * hist["total"]
+    width = hist["bin_width"]
+    seen = 0
+    for i, count in enumerate(hist["counts"]):
+        if count and seen + count >= target:
+            return (i + (target - seen) / count) * width
+        seen += count
+    upper = len(hist["counts"]) * width
+    return overflow_value if overflow_value is not None else upper
+
+def merge_histograms(hists):
+    """Sum histograms that share the same bin layout into a new one."""
+    merged = {"bin_width": hists[0]["bin_width"], "counts": [0] * len(hists[0]["counts"]),
+              "overflow": 0, "total": 0}
+    for hist in hists:
+        merged["counts"] = [a + b for a, b in zip(merged["counts"], hist["counts"])]
+        merged["overflow"] += hist["overflow"]
+        merged["total"] += hist["total"]
+    return merged
+
+def clamped_percentile(hist, p, lo, hi):
+    # bin interpolation can overshoot what was actually seen, keep it in [min, max]
+    if hist["total"] == 0:
+        return 0.0
+    return max(lo, min(hi, histogram_percentile(hist, p, hi)))
+
+
+# ---------------------------
+# Per-approach traffic stats
+# ---------------------------
+def new_traffic_stats(approaches=APPROACHES):
+    return {
+        a: {
+            "travel_time": new_running_stats(),
+            "delay": new_running_stats(),
+            "stops": new_running_stats(),
+            "travel_hist": new_histogram(),
+            "unfinished": 0,
+        }
+        for a in approaches
+    }
+
+def record_departure(stats, approach, travel_time, delay, stops, finished=True):
+    s = stats[approach]
+    if not finished:
+        s["unfinished"] += 1
+    update_running_stats(s["travel_time"], travel_time)
+    update_running_stats(s["delay"], delay)
+    update_running_stats(s["stops"], stops)
+    update_histogram(s["travel_hist"], travel_time)
+
+def summarize_traffic_stats(stats):
+    summary = {}
+    for approach, s in stats.items():
+        travel = s["travel_time"]
+        row = {
+            "count": travel["count"],
+            "unfinished": s["unfinished"],
+            "mean_travel": travel["mean"],
+            "std_travel": running_std(travel),
+            "mean_delay": s["delay"]["mean"],
+            "max_delay": s["delay"]["max"] or 0.0,
+            "mean_stops": s["stops"]["mean"],
+        }
+        for p in PERCENTILES:
+            row[f"p{p}_travel"] = clamped_percentile(s["travel_hist"], p, travel["min"], travel["max"])
+        summary[approach] = row
+    return summary
+
+def traffic_percentile(stats, p, approaches=None):
+    """p-th percentile of travel time over all departures of the given approaches."""
+    selected = [stats[a] for a in (approaches or stats)]
+    travels = [s["travel_time"] for s in selected if s["travel_time"]["count"]]
+    if not travels:
+        return 0.0
+    hists = [s["travel_hist"] for s in selected]
+    hist = hists[0] if len(hists) == 1 else merge_histograms(hists)
+    lo = min(t["min"] for t in travels)
+    hi = max(t["max"] for t in travels)
+    return clamped_percentile(hist, p, lo, hi)
+
+def traffic_mean(stats, key):
+    """Mean of "travel_time", "delay" or "stops" pooled over all approaches."""
+    count = sum(s[key]["count"] for s in stats.values())
+    if count == 0:
+        return 0.0
+    return sum(s[key]["mean"] * s[key]["count"] for s in stats.values()) / count
+
+def format_traffic_summary(summary):
+    lines = []
+    for approach, row in summary.items():
+        lines.append(
+            f"  {approach}: n={row['count']} (unfinished={row['unfinished']}) travel mean={row['mean_travel']:.2f}s "
+            f"p50={row['p50_travel']:.2f}s p95={row['p95_travel']:.2f}s p99={row['p99_travel']:.2f}s "
+            f"delay mean={row['mean_delay']:.2f}s max={row['max_delay']:.2f}s stops={row['mean_stops']:.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,67 @@
+import math
+
+import TrafficStats
+
+
+def test_running_stats_empty_and_single():
+    rs = TrafficStats.new_running_stats()
+    assert rs["mean"] == 0.0
+    assert TrafficStats.running_std(rs) == 0.0
+    TrafficStats.update_running_stats(rs, 4.0)
+    assert rs["mean"] == 4.0
+    assert TrafficStats.running_std(rs) == 0.0
+    assert rs["min"] == rs["max"] == 4.0
+
+def test_running_stats_mean_std():
+    rs = TrafficStats.new_running_stats()
+    for v in (2, 4, 4, 4, 5, 5, 7, 9):
+        TrafficStats.update_running_stats(rs, v)
+    assert rs["mean"] == 5.0
+    assert math.isclose(TrafficStats.running_std(rs), math.sqrt(32 / 7))
+
+def test_histogram_percentiles_known_sample():
+    hist = TrafficStats.new_histogram(bin_width=1.0, max_value=10.0)
+    for v in range(10):  # one value in each bin 0..9
+        TrafficStats.update_histogram(hist, v + 0.5)
+    assert TrafficStats.histogram_percentile(hist, 50) == 5.0
+    assert TrafficStats.histogram_percentile(hist, 95) == 9.5
+    assert TrafficStats.histogram_percentile(hist, 100) == 10.0
+
+def test_single_sample_percentiles_clamped():
+    stats = TrafficStats.new_traffic_stats()
+    TrafficStats.record_departure(stats, "NS", 10.1, 0.0, 0)
+    row = TrafficStats.summarize_traffic_stats(stats)["NS"]
+    assert row["p50_travel"] == row["p95_travel"] == row["p99_travel"] == 10.1
+
+def test_overflow_clamped_to_observed_max():
+    stats = TrafficStats.new_traffic_stats()
+    TrafficStats.record_departure(stats, "EW", 5.0, 0.0, 0)
+    TrafficStats.record_departure(stats, "EW", 500.0, 0.0, 0)
+    assert stats["EW"]["travel_hist"]["overflow"] == 1
+    row = TrafficStats.summarize_traffic_stats(stats)["EW"]
+    assert row["p99_travel"] == 500.0
+
+def test_merged_p95_differs_from_per_approach():
+    stats = TrafficStats.new_traffic_stats()
+    for i in range(100):
+        TrafficStats.record_departure(stats, "NS", 10.0 + i * 0.01, 0.0, 0)
+        TrafficStats.record_departure(stats, "EW", 30.0 + i * 0.01, 0.0, 0)
+    p95_ns = TrafficStats.traffic_percentile(stats, 95, ("NS",))
+    p95_ew = TrafficStats.traffic_percentile(stats, 95, ("EW",))
+    p95_all = TrafficStats.traffic_percentile(stats, 95)
+    assert 10.0 <= p95_ns <= 11.0
+    assert 30.0 <= p95_ew <= 31.0
+    # pooled p95 sits in the EW cluster, not at the average of the two
+    assert 30.0 <= p95_all <= 31.0
+
+def test_unfinished_counted_and_pooled_mean():
+    stats = TrafficStats.new_traffic_stats()
+    TrafficStats.record_departure(stats, "NS", 4.0, 1.0, 1)
+    TrafficStats.record_departure(stats, "EW", 8.0, 3.0, 0, finished=False)
+    TrafficStats.record_departure(stats, "EW", 6.0, 2.0, 2)
+    summary = TrafficStats.summarize_traffic_stats(stats)
+    assert summary["NS"]["unfinished"] == 0
+    assert summary["EW"]["unfinished"] == 1
+    assert summary["EW"]["count"] == 2
+    assert TrafficStats.traffic_mean(stats, "delay") == 2.0
+    assert TrafficStats.traffic_mean(TrafficStats.new_traffic_stats(), "stops") == 0.0